@@ -1,204 +1,456 @@
+import asyncio
 import logging
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 import pandas as pd
-from bs4 import BeautifulSoup
-import time
+import multiprocessing
+import glob
 import os
+from urllib.parse import parse_qs, urlparse
 
 # Configure logging
 logging.basicConfig(
-    filename="scraping.log", 
-    level=logging.INFO, 
+    filename="scraping.log",
+    level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def scrape_company_tables(page, company_name):
-    """Extracts multiple tables (default and historical shareholder info) for a specific company and appends them to a consolidated Excel file."""
-    output_file = "L1_share.xlsx"
+HOME_URL = "https://www.tianyancha.com/"
+
+# Cookies from the last successful login, reused until the session expires
+AUTH_STATE_FILE = "auth.json"
+
+# How long (ms) the saved-session check waits for the "登录/注册" link before
+# treating the session as logged in
+LOGIN_LINK_TIMEOUT = 5000
+
+# Finished steps, one "<company>\t<step>" line each, where a step is a sheet name
+# or NO_RESULTS_STEP; a restarted run skips finished steps and finished companies
+DONE_FILE = "done.txt"
+NO_RESULTS_STEP = "No Results"
+
+# Worker processes scraping in parallel, and logged-in browser contexts per worker
+WORKER_PROCESSES = 2
+CONCURRENCY = 4
+
+# Each worker streams its tables to one CSV per sheet ("<prefix>_worker<N>.csv");
+# they are merged into OUTPUT_FILE once the run finishes
+OUTPUT_FILE = "L1_share.xlsx"
+SHEET_CSV_PREFIXES = {
+    "Shareholders": "L1_share_shareholders",
+    "Historical Shareholders": "L1_share_historical_shareholders",
+}
+
+# Resource types the scraper pages never need; stylesheets are kept because the
+# :visible selectors and innerText reads depend on computed styles
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+SEARCH_BOX_SELECTOR = 'input[placeholder="请输入公司名称、老板姓名、品牌名称等"]:visible'
+TABLE_SELECTOR = "table.table-wrap.expand-table-wrap"
+COMPANY_LINK_SELECTOR = "a.index_alink__zcia5"
+
+# Companies label the historical shareholder tab differently; tried in order
+HISTORICAL_TAB_TEXTS = ["历史股东信息", "历史主要股东"]
+
+# Polled in the browser until the given element is no longer part of the document
+DETACHED_JS = """el => !el.isConnected"""
+
+# Text of the shareholder table, or null if the page has none
+TABLE_TEXT_JS = """selector => document.querySelector(selector)?.textContent ?? null"""
+
+# Polled in the browser until the table text differs from its text before a tab switch.
+# textContent is read straight from the DOM, unlike innerText which forces a layout
+TABLE_CHANGED_JS = """([selector, previousText]) => (document.querySelector(selector)?.textContent ?? null) !== previousText"""
+
+# Polled in the browser until the shareholder table is attached and no longer shows "加载中"
+TABLE_LOADED_JS = """selector => {
+    const table = document.querySelector(selector);
+    return table !== null && !table.textContent.includes("加载中");
+}"""
+
+# Pulls header and cell text out of a table element in a single round-trip
+EXTRACT_TABLE_JS = """tbl => {
+    const text = el => el.innerText.trim();
+    const headers = [...tbl.querySelectorAll("thead th")].map(text);
+    const rows = [...tbl.querySelectorAll("tbody tr")].map(
+        tr => [...tr.querySelectorAll("td")].map(text)
+    );
+    return {headers, rows};
+}"""
+
+def search_key(url):
+    """Returns the search term in a results page URL's key= query, or None."""
+    return parse_qs(urlparse(url).query).get("key", [None])[0]
+
+async def wait_until_detached(page, handle, timeout):
+    """Waits until the element behind a handle is removed from the page, then disposes the handle."""
     try:
-        logging.info(f"Starting to scrape data for company: {company_name}")
-        search_box = page.locator('input[placeholder="请输入公司名称、老板姓名、品牌名称等"]:visible').nth(0)
-        search_box.fill(company_name)
-        search_box.press("Enter")  # Press Enter to search
-        time.sleep(2)
+        await page.wait_for_function(DETACHED_JS, arg=handle, timeout=timeout)
+    except PlaywrightTimeoutError:
+        raise
+    except PlaywrightError:
+        # The handle's document was replaced by a full navigation, so the element is gone
+        pass
+    finally:
+        try:
+            await handle.dispose()
+        except PlaywrightError:
+            pass
+
+async def scrape_company_tables(page, search_box, company_name, sheet_csv_files, done_steps):
+    """Extracts multiple tables (default and historical shareholder info) for a specific company and appends them to the per-sheet CSV files, skipping tables listed in done_steps and recording each saved one in DONE_FILE."""
+    try:
+        logging.info("Starting to scrape data for company: %s", company_name)
+        # The previous results page is reused; only reload home if its search box is missing
+        if await search_box.count() == 0:
+            await page.goto(HOME_URL)
+        previous_link = await page.query_selector(COMPANY_LINK_SELECTOR)
+        await search_box.fill(company_name)
+        await search_box.press("Enter")  # Press Enter to search
+
+        # Wait for the results of this search, not the links left from the previous one
+        try:
+            await page.wait_for_url(
+                lambda url: search_key(url) == company_name, wait_until="domcontentloaded", timeout=10000
+            )
+        except PlaywrightTimeoutError:
+            logging.warning("Search for %s did not open its results page. Skipping...", company_name)
+            return
+
+        # The previous search's result links must be gone before the new ones are trusted
+        if previous_link is not None:
+            try:
+                await wait_until_detached(page, previous_link, timeout=10000)
+            except PlaywrightTimeoutError:
+                logging.warning("Results for %s did not replace the previous search. Skipping...", company_name)
+                return
 
         # Click on the first company link
-        company_link = page.locator("a.index_alink__zcia5").first
-        if not company_link:
-            logging.warning(f"No results found for {company_name}. Skipping...")
+        try:
+            await page.wait_for_selector(COMPANY_LINK_SELECTOR, timeout=10000)
+        except PlaywrightTimeoutError:
+            logging.warning("No results found for %s. Skipping...", company_name)
+            mark_step_done(company_name, NO_RESULTS_STEP)
             return
+        company_link = page.locator(COMPANY_LINK_SELECTOR).first
 
         company_name_element = company_link.locator("span em")
-        company_name_text = company_name_element.text_content().strip()
+        company_name_text = (await company_name_element.text_content()).strip()
 
-        with page.expect_popup() as popup_info:
-            company_link.click()
-        popup_page = popup_info.value  # Get the popup page object
-        popup_page.wait_for_load_state("domcontentloaded")
+        async with page.expect_popup() as popup_info:
+            await company_link.click()
+        popup_page = await popup_info.value  # Get the popup page object
+        await popup_page.wait_for_load_state("domcontentloaded")
 
-        logging.info(f"Popup page loaded for company: {company_name}")
+        logging.info("Popup page loaded for company: %s", company_name)
 
-        # Scrape default shareholder table
-        df_shareholders = scrape_table(popup_page, company_name, company_name_text, "股东信息")
-        if df_shareholders is not None:
-            append_to_excel(df_shareholders, output_file, "Shareholders")
+        # Scrape default shareholder table, unless an earlier run already saved it
+        if "Shareholders" not in done_steps:
+            df_shareholders = await scrape_table(popup_page, company_name, company_name_text, "股东信息")
+            if df_shareholders is not None and append_to_csv(df_shareholders, sheet_csv_files["Shareholders"]):
+                mark_step_done(company_name, "Shareholders")
 
         # Try scraping the historical shareholder table
+        if "Historical Shareholders" in done_steps:
+            return
         try:
             logging.info("Attempting to scrape historical shareholder information...")
-            tab_found = False
-            for tab_text in ["历史股东信息", "历史主要股东"]:
-                try:
-                    tab_locator = popup_page.locator("span.dim-tab-item").filter(has_text=tab_text)
-                    tab_locator.click()
-                    popup_page.wait_for_timeout(3000)  # Wait for tab content to load
-                    logging.info(f"Clicked on tab: {tab_text}")
-                    tab_found = True
+            # Look the tabs up without waiting, so a missing tab costs no click timeout
+            tab_text = None
+            for candidate in HISTORICAL_TAB_TEXTS:
+                tab_locator = popup_page.locator("span.dim-tab-item").filter(has_text=candidate)
+                if await tab_locator.count() > 0:
+                    tab_text = candidate
                     break
-                except Exception:
-                    logging.warning(f"Tab '{tab_text}' not found. Trying next...")
+                logging.warning("Tab '%s' not found. Trying next...", candidate)
 
-            if not tab_found:
-                logging.error(f"No historical shareholder tab found for {company_name}. Skipping...")
+            if tab_text is None:
+                logging.error("No historical shareholder tab found for %s. Skipping...", company_name)
+                mark_step_done(company_name, "Historical Shareholders")  # Nothing to scrape, so nothing to retry
             else:
+                # Read the current table text without waiting, in case there is no default table
+                previous_text = await popup_page.evaluate(TABLE_TEXT_JS, TABLE_SELECTOR)
+                await tab_locator.first.click(timeout=3000)
+                # Wait for the tab to swap the table content instead of a fixed delay
+                await popup_page.wait_for_function(TABLE_CHANGED_JS, arg=[TABLE_SELECTOR, previous_text], timeout=10000)
+                logging.info("Clicked on tab: %s", tab_text)
+
                 # Scrape the historical shareholders table
-                df_historical = scrape_table(popup_page, company_name, company_name_text, tab_text)
-                if df_historical is not None:
-                    append_to_excel(df_historical, output_file, "Historical Shareholders")
+                df_historical = await scrape_table(popup_page, company_name, company_name_text, tab_text)
+                if df_historical is not None and append_to_csv(df_historical, sheet_csv_files["Historical Shareholders"]):
+                    mark_step_done(company_name, "Historical Shareholders")
         except Exception as e:
-            logging.error(f"Error occurred while scraping historical shareholder info for {company_name}: {e}")
+            logging.error("Error occurred while scraping historical shareholder info for %s: %s", company_name, e)
 
     except Exception as e:
-        logging.error(f"Error occurred while scraping data for {company_name}: {e}")
+        logging.error("Error occurred while scraping data for %s: %s", company_name, e)
 
     finally:
         try:
-            popup_page.close()
+            await popup_page.close()
         except Exception:
             pass
-        page.goto("https://www.tianyancha.com/")
 
-def scrape_table(page, original_name, matched_name, table_title):
+async def scrape_table(page, original_name, matched_name, table_title):
     """Scrapes a single table and returns it as a DataFrame."""
     try:
-        logging.info(f"Scraping {table_title} for {original_name}")
+        logging.info("Scraping %s for %s", table_title, original_name)
         
         # Wait for the table element to load completely
-        table_locator = page.locator("table.table-wrap.expand-table-wrap")
-        max_retries = 5
-        retries = 0
-        table_loaded = False
-
-        while retries < max_retries:
-            table_html = table_locator.inner_html()
-            if "加载中" not in table_html:  # Check if "加载中" is no longer in the table content
-                table_loaded = True
-                break
-            logging.info(f"Table still loading... Retry {retries + 1}")
-            retries += 1
-            time.sleep(2)  # Wait before retrying
-
-        if not table_loaded:
-            logging.error(f"{table_title} table did not load completely for {original_name} after retries.")
+        table_locator = page.locator(TABLE_SELECTOR)
+        try:
+            await page.wait_for_function(TABLE_LOADED_JS, arg=TABLE_SELECTOR, timeout=15000)
+        except PlaywrightTimeoutError:
+            logging.error("%s table did not load completely for %s within timeout.", table_title, original_name)
             return None
 
-        # Parse the table with BeautifulSoup
-        logging.debug(f"Table HTML for {table_title}: {table_html[:500]}")  # Log the first 500 characters for debugging
-        soup = BeautifulSoup(table_html, "html.parser")
-        headers = [th.get_text(strip=True) for th in soup.find("thead").find_all("th")]
-        rows = []
-        for tr in soup.find("tbody").find_all("tr"):
-            cols = [td.get_text(strip=True) for td in tr.find_all("td")]
-            if len(cols) == len(headers):  # Ensure the row matches the number of headers
-                rows.append(cols)
-            else:
-                logging.warning(f"Incomplete row skipped: {cols}")
+        # Read headers and cells straight from the browser DOM
+        table_data = await table_locator.evaluate(EXTRACT_TABLE_JS)
+        headers = table_data["headers"]
+        # Keep only rows that match the number of headers
+        expected = len(headers)
+        rows = [[original_name, matched_name] + cols for cols in table_data["rows"] if len(cols) == expected]
+        dropped = len(table_data["rows"]) - len(rows)
+        if dropped:
+            logging.warning("Skipped %s incomplete rows in %s for %s", dropped, table_title, original_name)
 
-        # Return DataFrame
-        df = pd.DataFrame(rows, columns=headers)
-        df.insert(0, "Original Company Name", original_name)
-        df.insert(1, "Matched Company Name", matched_name)
-        return df
+        # Return DataFrame with the company name columns already in place
+        columns = ["Original Company Name", "Matched Company Name"] + headers
+        return pd.DataFrame(rows, columns=columns, dtype=str)
     except Exception as e:
-        logging.error(f"Error occurred while scraping {table_title}: {e}")
+        logging.error("Error occurred while scraping %s: %s", table_title, e)
         return None
     
 
-def append_to_excel(df, output_file, sheet_name):
-    """Appends a DataFrame to an Excel file in the specified sheet."""
+def append_to_csv(df, csv_file):
+    """Appends a DataFrame to a CSV file, writing the header only when the file is new. Returns True on success."""
     try:
-        if not os.path.exists(output_file):
-            # Create a new file if it doesn't exist
-            with pd.ExcelWriter(output_file, mode="w") as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        if os.path.exists(csv_file):
+            columns = pd.read_csv(csv_file, nrows=0).columns
+            new_columns = [col for col in df.columns if col not in columns]
+            if new_columns:
+                # A table with columns not yet on disk: rewrite the file with the union of columns
+                logging.info("Adding columns %s to %s", new_columns, csv_file)
+                existing_df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+                pd.concat([existing_df, df], ignore_index=True).to_csv(csv_file, mode="w", header=True, index=False)
+            else:
+                # Keep the table aligned with the columns already on disk
+                df.reindex(columns=columns).to_csv(csv_file, mode="a", header=False, index=False)
         else:
-            # Append to the existing file
-            existing_df = None
-            try:
-                existing_df = pd.read_excel(output_file, sheet_name=sheet_name)
-            except Exception:
-                logging.warning(f"Sheet {sheet_name} does not exist. Creating a new one.")
+            df.to_csv(csv_file, mode="w", header=True, index=False)
+        logging.info("Data appended to %s", csv_file)
+        return True
+    except Exception as e:
+        logging.error("Error appending to CSV: %s", e)
+        return False
+
+def load_done_steps():
+    """Returns a dict mapping each company name in DONE_FILE to the set of steps earlier runs finished."""
+    done_steps = {}
+    if not os.path.exists(DONE_FILE):
+        return done_steps
+    with open(DONE_FILE, encoding="utf-8") as f:
+        for line in f:
+            company_name, _, step = line.rstrip("\n").partition("\t")
+            if step:
+                done_steps.setdefault(company_name, set()).add(step)
+    return done_steps
+
+def is_company_done(steps):
+    """Returns True when the finished steps leave nothing to scrape for a company."""
+    return NO_RESULTS_STEP in steps or set(SHEET_CSV_PREFIXES) <= steps
+
+def mark_step_done(company_name, step):
+    """Records a finished step for a company in DONE_FILE so later runs skip it."""
+    with open(DONE_FILE, "a", encoding="utf-8") as f:
+        f.write(f"{company_name}\t{step}\n")
 
-            if existing_df is not None:
-                df = pd.concat([existing_df, df], ignore_index=True)
+def worker_csv_files(worker_id):
+    """Returns the CSV file each sheet is streamed to by the given worker."""
+    return {sheet_name: f"{prefix}_worker{worker_id}.csv" for sheet_name, prefix in SHEET_CSV_PREFIXES.items()}
 
-            with pd.ExcelWriter(output_file, mode="a", if_sheet_exists="replace") as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-        logging.info(f"Data appended to {output_file} in sheet {sheet_name}")
+def convert_csv_to_excel(output_file, sheet_csv_prefixes):
+    """Merges every worker's CSV files into a single Excel workbook, one sheet each."""
+    try:
+        sheets = {
+            sheet_name: sorted(glob.glob(f"{prefix}_worker*.csv")) for sheet_name, prefix in sheet_csv_prefixes.items()
+        }
+        sheets = {sheet_name: csv_files for sheet_name, csv_files in sheets.items() if csv_files}
+        if not sheets:
+            logging.warning("No scraped data found. Skipping %s.", output_file)
+            return
+        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
+            for sheet_name, csv_files in sheets.items():
+                frames = [pd.read_csv(csv_file, dtype=str, keep_default_na=False) for csv_file in csv_files]
+                pd.concat(frames, ignore_index=True).to_excel(writer, sheet_name=sheet_name, index=False)
+        logging.info("Data written to %s (%s)", output_file, ", ".join(sheets))
     except Exception as e:
-        logging.error(f"Error appending to Excel: {e}")
+        logging.error("Error writing to Excel: %s", e)
 
-def retry_open_browser(playwright):
-    """Attempts to open the browser and retry login if needed."""
+async def retry_open_browser(playwright, open_page=True):
+    """Attempts to open the browser and retry login if needed. With open_page=False only the browser is launched and page is None."""
     for attempt in range(3):
         try:
-            browser = playwright.chromium.launch(headless=False)
-            context = browser.new_context()
-            page = context.new_page()
-            logging.info(f"Browser launched successfully on attempt {attempt + 1}")
+            browser = await playwright.chromium.launch(headless=False)
+            page = None
+            if open_page:
+                context = await browser.new_context()
+                page = await context.new_page()
+            logging.info("Browser launched successfully on attempt %s", attempt + 1)
             return browser, page
         except Exception as e:
-            logging.warning(f"Browser launch failed on attempt {attempt + 1}: {e}")
+            logging.warning("Browser launch failed on attempt %s: %s", attempt + 1, e)
     logging.error("Failed to launch browser after multiple attempts.")
     return None, None
 
-def run(playwright):
+async def has_valid_session(browser):
+    """Checks whether the saved auth state is still logged in."""
+    if not os.path.exists(AUTH_STATE_FILE):
+        return False
+    context = await browser.new_context(storage_state=AUTH_STATE_FILE)
     try:
-        browser, page = retry_open_browser(playwright)
+        page = await context.new_page()
+        await page.goto(HOME_URL)
+        # The header may render the login link after load, so give it time to show up
+        try:
+            await page.get_by_text("登录/注册").first.wait_for(state="visible", timeout=LOGIN_LINK_TIMEOUT)
+            return False
+        except PlaywrightTimeoutError:
+            return True
+    except Exception as e:
+        logging.warning("Could not verify saved session: %s", e)
+        return False
+    finally:
+        await context.close()
+
+async def login(page):
+    """Logs in through the site form, waits for the CAPTCHA and saves the session."""
+    await page.goto(HOME_URL)
+    await page.get_by_text("登录/注册").first.click()
+    await page.locator(".login-toggle").click()
+
+    # Enter login details (replace with your own account)
+    await page.get_by_placeholder("请输入中国大陆手机号").fill("")
+    await page.get_by_text("密码登录").click()
+    await page.get_by_placeholder("请输入登录密码").fill("")
+    await page.get_by_label("我已阅读并同意《用户协议》《隐私权政策》").check()
+    await page.get_by_role("button", name="登录").click()
+
+    # Wait for manual CAPTCHA solving
+    logging.info("Waiting for CAPTCHA to be solved manually...")
+    await asyncio.to_thread(input, "Paused! Solve the CAPTCHA manually and press Enter to continue...")
+
+    await page.context.storage_state(path=AUTH_STATE_FILE)
+    logging.info("Login session saved to %s", AUTH_STATE_FILE)
+
+async def block_unneeded_resources(route):
+    """Aborts requests for resources that the table scraping does not use."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def open_scraper_pages(browser, storage_state, count):
+    """Opens logged-in pages in separate browser contexts that share the given auth state."""
+    pages = []
+    for _ in range(count):
+        context = await browser.new_context(storage_state=storage_state)
+        await context.route("**/*", block_unneeded_resources)
+        page = await context.new_page()
+        await page.goto(HOME_URL)
+        # Build the search box locator once per page and reuse it for every company
+        search_box = page.locator(SEARCH_BOX_SELECTOR).first
+        pages.append((page, search_box))
+    logging.info("Opened %s scraper contexts", count)
+    return pages
+
+async def consume_companies(queue, page, search_box, sheet_csv_files):
+    """Scrapes companies from the shared queue on one page until it reads a stop marker."""
+    while (item := await asyncio.to_thread(queue.get)) is not None:
+        company_name, done_steps = item
+        await scrape_company_tables(page, search_box, company_name, sheet_csv_files, done_steps)
+
+async def run_worker(worker_id, queue):
+    """Opens a browser with the saved session and scrapes queued companies on CONCURRENCY pages."""
+    async with async_playwright() as playwright:
+        browser, _ = await retry_open_browser(playwright, open_page=False)
+        if not browser:
+            logging.critical("Worker %s failed to launch browser. Exiting...", worker_id)
+            return
+        try:
+            pages = await open_scraper_pages(browser, AUTH_STATE_FILE, CONCURRENCY)
+            sheet_csv_files = worker_csv_files(worker_id)
+            await asyncio.gather(
+                *(consume_companies(queue, page, search_box, sheet_csv_files) for page, search_box in pages)
+            )
+        except Exception as e:
+            logging.critical("Worker %s stopped after an unexpected error: %s", worker_id, e)
+        finally:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+def scrape_worker(worker_id, queue):
+    """Entry point of a worker process."""
+    asyncio.run(run_worker(worker_id, queue))
+
+async def prepare_session():
+    """Makes sure AUTH_STATE_FILE holds a logged-in session, logging in if needed."""
+    async with async_playwright() as playwright:
+        browser, page = await retry_open_browser(playwright)
         if not browser or not page:
             logging.critical("Failed to launch browser. Exiting...")
-            return
+            return False
+        try:
+            # Only go through the login form when the saved session has expired
+            if await has_valid_session(browser):
+                logging.info("Reusing login session from %s", AUTH_STATE_FILE)
+            else:
+                await login(page)
+            return True
+        finally:
+            await browser.close()
 
-        page.goto("https://www.tianyancha.com/")
-        page.get_by_text("登录/注册").first.click()
-        page.locator(".login-toggle").click()
+def run():
+    try:
+        if not asyncio.run(prepare_session()):
+            return
 
-        # Enter login details (replace with your own account)
-        page.get_by_placeholder("请输入中国大陆手机号").fill("")
-        page.get_by_text("密码登录").click()
-        page.get_by_placeholder("请输入登录密码").fill("")
-        page.get_by_label("我已阅读并同意《用户协议》《隐私权政策》").check()
-        page.get_by_role("button", name="登录").click()
+        # Load company names, skipping blanks and repeated entries
+        company_names = pd.read_excel("test.xlsx", header=None)[0].dropna().astype(str).str.strip()
+        company_list = company_names[company_names != ""].drop_duplicates().tolist()
 
-        # Wait for manual CAPTCHA solving
-        logging.info("Waiting for CAPTCHA to be solved manually...")
-        input("Paused! Solve the CAPTCHA manually and press Enter to continue...")
+        # Resume an interrupted run by skipping companies and tables that were already scraped
+        done_steps = load_done_steps()
+        pending = [
+            (company_name, done_steps.get(company_name, set()))
+            for company_name in company_list
+            if not is_company_done(done_steps.get(company_name, set()))
+        ]
+        logging.info("%s companies to scrape, %s already done", len(pending), len(company_list) - len(pending))
 
-        # Load company names
-        company_list = pd.read_excel("test.xlsx", header=None)[0].tolist()
+        # Queue every pending company with its finished steps, followed by one stop marker per scraper page
+        queue = multiprocessing.Queue()
+        for item in pending:
+            queue.put(item)
+        for _ in range(WORKER_PROCESSES * CONCURRENCY):
+            queue.put(None)
 
-        # Scrape data for each company
-        for company_name in company_list:
-            scrape_company_tables(page, company_name)
+        workers = [
+            multiprocessing.Process(target=scrape_worker, args=(worker_id, queue))
+            for worker_id in range(WORKER_PROCESSES)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # Companies left behind by a crashed worker must not block interpreter exit
+        queue.cancel_join_thread()
 
     except Exception as e:
-        logging.critical(f"An unexpected error occurred: {e}")
+        logging.critical("An unexpected error occurred: %s", e)
     finally:
-        try:
-            browser.close()
-        except Exception:
-            pass
+        convert_csv_to_excel(OUTPUT_FILE, SHEET_CSV_PREFIXES)
 
 if __name__ == "__main__":
-    with sync_playwright() as playwright:
-        run(playwright)
\ No newline at end of file
+    run()